@@ -0,0 +1,43 @@
+"""add (agent_id, date) indexes to per-day log tables
+
+The composite indexes cover agent_id-only lookups through their leading column,
+so the single-column agent_id indexes on these tables are dropped.
+
+Revision ID: 0013_add_agent_date_indexes
+Revises: 0012_add_guard_and_audit_fields
+Create Date: 2026-10-16 09:00:00
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "0013_add_agent_date_indexes"
+down_revision: Union[str, Sequence[str], None] = "0012_add_guard_and_audit_fields"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_daily_pdca_agent_date", "daily_pdca", ["agent_id", "date"], unique=False)
+    op.create_index("ix_cost_logs_agent_date", "cost_logs", ["agent_id", "date"], unique=False)
+    op.create_index("ix_search_logs_agent_date", "search_logs", ["agent_id", "date"], unique=False)
+    op.create_index("ix_fetch_logs_agent_date", "fetch_logs", ["agent_id", "date"], unique=False)
+
+    op.drop_index("ix_fetch_logs_agent_id", table_name="fetch_logs")
+    op.drop_index("ix_search_logs_agent_id", table_name="search_logs")
+    op.drop_index("ix_cost_logs_agent_id", table_name="cost_logs")
+    op.drop_index("ix_daily_pdca_agent_id", table_name="daily_pdca")
+
+
+def downgrade() -> None:
+    op.create_index("ix_daily_pdca_agent_id", "daily_pdca", ["agent_id"], unique=False)
+    op.create_index("ix_cost_logs_agent_id", "cost_logs", ["agent_id"], unique=False)
+    op.create_index("ix_search_logs_agent_id", "search_logs", ["agent_id"], unique=False)
+    op.create_index("ix_fetch_logs_agent_id", "fetch_logs", ["agent_id"], unique=False)
+
+    op.drop_index("ix_fetch_logs_agent_date", table_name="fetch_logs")
+    op.drop_index("ix_search_logs_agent_date", table_name="search_logs")
+    op.drop_index("ix_cost_logs_agent_date", table_name="cost_logs")
+    op.drop_index("ix_daily_pdca_agent_date", table_name="daily_pdca")
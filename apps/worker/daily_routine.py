@@ -7,7 +7,7 @@ from datetime import date, datetime, timedelta, timezone
 from zoneinfo import ZoneInfo
 from decimal import Decimal
 from pathlib import Path
-from typing import Protocol
+from typing import Callable, Protocol
 
 from sqlalchemy import select
 from sqlalchemy.orm import Session
@@ -26,7 +26,7 @@ from core import (
     XClient,
     XUsage,
 )
-from core.db import Base, SessionLocal, engine
+from core.db import Base, SessionLocal
 from core.models import (
     ActionType,
     Account,
@@ -155,6 +155,9 @@ class FakeXClient:
             clicks=clicks,
         )
 
+    def list_post_metrics(self, external_posts: list[ExternalPost]) -> list[ExternalPostMetrics]:
+        return [self.get_post_metrics(external_post) for external_post in external_posts]
+
     def get_daily_usage(self, usage_date: date) -> XUsage:
         return XUsage(usage_date=usage_date, units=0, raw={"source": "fake"})
 
@@ -774,12 +777,18 @@ def _write_daily_log(agent_id: int, target_date: date, payload: dict[str, object
     return log_path
 
 
-def run_daily_routine(agent_id: int, base_date: date, x_client: XClient | None = None) -> dict[str, object]:
+def run_daily_routine(
+    agent_id: int,
+    base_date: date,
+    x_client: XClient | None = None,
+    session_factory: Callable[[], Session] | None = None,
+) -> dict[str, object]:
     target_date = base_date - timedelta(days=2)
     now = datetime.now(timezone.utc).replace(microsecond=0)
-    Base.metadata.create_all(bind=engine)
+    session_factory = session_factory or SessionLocal
 
-    with SessionLocal() as session:
+    with session_factory() as session:
+        Base.metadata.create_all(bind=session.get_bind())
         agent = _ensure_agent(session, agent_id)
         guard = GuardManager(session)
         if not guard.is_agent_runnable(agent, now):
@@ -15,7 +15,7 @@ from core import BudgetExceededError, BudgetLedger, GuardManager, Poster, RateLi
 from core.db import SessionLocal
 from core.models import ActionType, Agent, AgentStatus, AuditLog, DailyPDCA, Post, PostType, XAuthToken
 
-from .real_x_client import RealXClient
+from .real_x_client import RealXClient, shared_http_client
 from .feature_toggles import read_int_toggle
 from .usage_reconcile import reconcile_app_usage
 
@@ -47,7 +47,7 @@ class FakePoster:
 class RealPoster:
     def __init__(self, account_tokens: dict[int, str], http_client: httpx.Client | None = None) -> None:
         self._account_tokens = account_tokens
-        self._http_client = http_client or httpx.Client(timeout=15.0)
+        self._http_client = http_client or shared_http_client()
 
     def _client_for_agent(self, agent_id: int) -> RealXClient:
         token = self._account_tokens.get(agent_id)
@@ -92,7 +92,7 @@ class InvalidTargetUrlError(ValueError):
 class AccountTokenProvider:
     def __init__(self, session: Session, http_client: httpx.Client | None = None) -> None:
         self._session = session
-        self._http_client = http_client or httpx.Client(timeout=15.0)
+        self._http_client = http_client or shared_http_client()
 
     def token_for_agent(self, agent: Agent, now: datetime) -> str:
         token = self._session.scalar(select(XAuthToken).where(XAuthToken.account_id == agent.account_id))
@@ -5,6 +5,8 @@ from datetime import date, datetime, time, timedelta, timezone
 
 import httpx
 
+from .real_x_client import decode_json, shared_http_client
+
 
 class XUsageClientError(RuntimeError):
     pass
@@ -26,7 +28,7 @@ class XUsageClient:
     ) -> None:
         self._bearer_token = bearer_token
         self._base_url = base_url.rstrip("/")
-        self._http_client = http_client or httpx.Client(timeout=15.0)
+        self._http_client = http_client or shared_http_client()
 
     def fetch_daily_usage(self, target_date: date) -> UsageSnapshot:
         start_time = datetime.combine(target_date, time.min, tzinfo=timezone.utc)
@@ -47,7 +49,7 @@ class XUsageClient:
         except httpx.RequestError as exc:
             raise XUsageClientError(f"usage_api_network_{exc.__class__.__name__}") from exc
 
-        payload = response.json()
+        payload = decode_json(response)
         if not isinstance(payload, dict):
             payload = {}
         return UsageSnapshot(units=self._extract_usage_units(payload), raw=payload)
@@ -14,7 +14,16 @@ from .controls import (
 from .interfaces import Poster, WorkerJob
 from .models import Heartbeat
 from .placeholders import DomainPlaceholder
-from .x_client import ExternalPost, ExternalPostMetrics, TargetPost, TargetPostSource, XClient, XUsage
+from .x_client import (
+    BatchingXClient,
+    BatchMetricsXClient,
+    ExternalPost,
+    ExternalPostMetrics,
+    TargetPost,
+    TargetPostSource,
+    XClient,
+    XUsage,
+)
 
 __all__ = [
     "Base",
@@ -31,6 +40,8 @@ __all__ = [
     "Poster",
     "DomainPlaceholder",
     "XClient",
+    "BatchMetricsXClient",
+    "BatchingXClient",
     "ExternalPost",
     "ExternalPostMetrics",
     "TargetPost",
@@ -220,10 +220,10 @@ class Experiment(Base):
 
 class DailyPDCA(Base):
     __tablename__ = "daily_pdca"
-    __table_args__ = (Index("ix_daily_pdca_date", "date"),)
+    __table_args__ = (Index("ix_daily_pdca_date", "date"), Index("ix_daily_pdca_agent_date", "agent_id", "date"))
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    agent_id: Mapped[int] = mapped_column(ForeignKey("agents.id"), nullable=False, index=True)
+    agent_id: Mapped[int] = mapped_column(ForeignKey("agents.id"), nullable=False)
     date: Mapped[date] = mapped_column(Date, nullable=False)
     analytics_summary: Mapped[dict[str, Any]] = mapped_column(JSONType, nullable=False, default=dict)
     analysis: Mapped[dict[str, Any]] = mapped_column(JSONType, nullable=False, default=dict)
@@ -297,10 +297,10 @@ class TargetPostCandidate(Base):
 
 class CostLog(Base):
     __tablename__ = "cost_logs"
-    __table_args__ = (Index("ix_cost_logs_date", "date"),)
+    __table_args__ = (Index("ix_cost_logs_date", "date"), Index("ix_cost_logs_agent_date", "agent_id", "date"))
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    agent_id: Mapped[int] = mapped_column(ForeignKey("agents.id"), nullable=False, index=True)
+    agent_id: Mapped[int] = mapped_column(ForeignKey("agents.id"), nullable=False)
     date: Mapped[date] = mapped_column(Date, nullable=False)
     x_api_cost: Mapped[Decimal] = mapped_column(Numeric(12, 2), nullable=False, default=0, server_default="0")
     x_api_cost_estimate: Mapped[Decimal] = mapped_column(
@@ -318,10 +318,14 @@ class CostLog(Base):
 
 class SearchLog(Base):
     __tablename__ = "search_logs"
-    __table_args__ = (Index("ix_search_logs_date", "date"), Index("ix_search_logs_date_source", "date", "source"),)
+    __table_args__ = (
+        Index("ix_search_logs_date", "date"),
+        Index("ix_search_logs_date_source", "date", "source"),
+        Index("ix_search_logs_agent_date", "agent_id", "date"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    agent_id: Mapped[int] = mapped_column(ForeignKey("agents.id"), nullable=False, index=True)
+    agent_id: Mapped[int] = mapped_column(ForeignKey("agents.id"), nullable=False)
     date: Mapped[date] = mapped_column(Date, nullable=False)
     source: Mapped[str] = mapped_column(String(32), nullable=False)
     query: Mapped[str] = mapped_column(Text, nullable=False)
@@ -369,10 +373,14 @@ class OAuthState(Base):
 
 class FetchLog(Base):
     __tablename__ = "fetch_logs"
-    __table_args__ = (Index("ix_fetch_logs_date", "date"), Index("ix_fetch_logs_date_status", "date", "status"),)
+    __table_args__ = (
+        Index("ix_fetch_logs_date", "date"),
+        Index("ix_fetch_logs_date_status", "date", "status"),
+        Index("ix_fetch_logs_agent_date", "agent_id", "date"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    agent_id: Mapped[int] = mapped_column(ForeignKey("agents.id"), nullable=False, index=True)
+    agent_id: Mapped[int] = mapped_column(ForeignKey("agents.id"), nullable=False)
     date: Mapped[date] = mapped_column(Date, nullable=False)
     url: Mapped[str] = mapped_column(String(2048), nullable=False)
     status: Mapped[str] = mapped_column(String(32), nullable=False)
@@ -1,5 +1,9 @@
 from __future__ import annotations
 
+import queue
+import threading
+import time
+from concurrent.futures import Future
 from dataclasses import dataclass, field
 from datetime import date, datetime
 from typing import Protocol
@@ -7,7 +11,7 @@ from typing import Protocol
 from .db.models import PostType
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ExternalPost:
     external_id: str
     posted_at: datetime
@@ -16,7 +20,7 @@ class ExternalPost:
     media_urls: list[str] = field(default_factory=list)
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ExternalPostMetrics:
     external_id: str
     impressions: int = 0
@@ -53,5 +57,147 @@ class XClient(Protocol):
     def get_daily_usage(self, usage_date: date) -> XUsage: ...
 
 
+class BatchMetricsXClient(XClient, Protocol):
+    def list_post_metrics(self, external_posts: list[ExternalPost]) -> list[ExternalPostMetrics]: ...
+
+
+_Pending = tuple[ExternalPost, Future[ExternalPostMetrics]]
+
+
+class BatchingXClient:
+    """Coalesces concurrent get_post_metrics calls into list_post_metrics batches.
+
+    A background thread waits for the first request, then flushes
+    ``flush_interval`` seconds later, or sooner once ``flush_size`` requests are
+    waiting, sending at most ``max_batch`` distinct ids per upstream lookup.
+    """
+
+    def __init__(
+        self,
+        client: BatchMetricsXClient,
+        *,
+        flush_interval: float = 0.05,
+        flush_size: int = 50,
+        max_batch: int = 100,
+    ) -> None:
+        self._client = client
+        self._flush_interval = flush_interval
+        self._flush_size = flush_size
+        self._max_batch = max_batch
+        # None is the stop sentinel enqueued by close().
+        self._queue: queue.Queue[_Pending | None] = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name="x-metrics-batcher", daemon=True)
+        self._worker.start()
+
+    def __enter__(self) -> BatchingXClient:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def resolve_user_id(self, handle_or_me: str = "me") -> str:
+        return self._client.resolve_user_id(handle_or_me)
+
+    def list_posts(self, agent_id: int, target_date: date) -> list[ExternalPost]:
+        return self._client.list_posts(agent_id, target_date)
+
+    def get_daily_usage(self, usage_date: date) -> XUsage:
+        return self._client.get_daily_usage(usage_date)
+
+    def list_post_metrics(self, external_posts: list[ExternalPost]) -> list[ExternalPostMetrics]:
+        return self._client.list_post_metrics(external_posts)
+
+    def get_post_metrics(self, external_post: ExternalPost, timeout: float | None = None) -> ExternalPostMetrics:
+        future: Future[ExternalPostMetrics] = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("BatchingXClient is closed")
+            self._queue.put((external_post, future))
+        return future.result(timeout=timeout)
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._closed:
+                self._closed = True
+                self._queue.put(None)
+        self._worker.join()
+
+    def _run(self) -> None:
+        try:
+            stopped = False
+            while not stopped:
+                batch, stopped = self._next_batch()
+                if batch:
+                    self._flush(batch)
+        except BaseException as exc:
+            # The worker is gone; stop accepting requests and fail whatever is still queued.
+            with self._lock:
+                self._closed = True
+            self._fail_queued(exc)
+            raise
+
+    def _fail_queued(self, exc: BaseException) -> None:
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not None and not item[1].done():
+                item[1].set_exception(exc)
+
+    def _next_batch(self) -> tuple[list[_Pending], bool]:
+        # Sleep until work arrives; the flush_interval window opens with the first request of a batch.
+        first = self._queue.get()
+        if first is None:
+            return [], True
+        batch = [first]
+
+        deadline = time.monotonic() + self._flush_interval
+        while len(batch) < self._flush_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        while len(batch) < self._max_batch:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _flush(self, batch: list[_Pending]) -> None:
+        try:
+            # Repeated ids are looked up once and the result is shared by every caller that asked for it.
+            posts: dict[str, ExternalPost] = {}
+            waiters: dict[str, list[Future[ExternalPostMetrics]]] = {}
+            for external_post, future in batch:
+                posts.setdefault(external_post.external_id, external_post)
+                waiters.setdefault(external_post.external_id, []).append(future)
+
+            metrics = self._client.list_post_metrics(list(posts.values()))
+            by_id = {item.external_id: item for item in metrics}
+            for external_id, futures in waiters.items():
+                result = by_id.get(external_id, ExternalPostMetrics(external_id=external_id))
+                for future in futures:
+                    future.set_result(result)
+        except BaseException as exc:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            if not isinstance(exc, Exception):
+                raise
+
+
 class TargetPostSource(Protocol):
     def list_target_posts(self, agent_id: int, handles: list[str], limit: int) -> list[TargetPost]: ...
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import StaticPool
+
+MEMORY_DATABASE_URL = "sqlite+pysqlite:///:memory:"
+# Shared test engines live for the whole session, so give their compiled-statement cache room to stay warm.
+QUERY_CACHE_SIZE = 1200
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA synchronous=OFF")
+    cursor.execute("PRAGMA journal_mode=MEMORY")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+def _enable_foreign_keys(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+def use_test_pragmas(engine: Engine) -> None:
+    # Test databases are throwaway, so skip fsync and keep journals in memory on every new connection.
+    if engine.dialect.name != "sqlite":
+        return
+    if not event.contains(engine, "connect", _set_sqlite_pragmas):
+        event.listen(engine, "connect", _set_sqlite_pragmas)
+
+
+def make_memory_engine(url: str = MEMORY_DATABASE_URL, *, foreign_keys: bool = False) -> Engine:
+    # StaticPool keeps the one connection alive, so a memory database never loses its schema mid-test.
+    engine = create_engine(
+        url,
+        future=True,
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False},
+        query_cache_size=QUERY_CACHE_SIZE,
+    )
+
+    use_test_pragmas(engine)
+    if foreign_keys:
+        # SQLite only enforces FKs per connection, so enable them on every connection rather than relying on the pool.
+        event.listen(engine, "connect", _enable_foreign_keys)
+    return engine
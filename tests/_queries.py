@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+from datetime import date
+from typing import Any
+
+from sqlalchemy import Row, and_, bindparam, lambda_stmt, select
+from sqlalchemy.engine import Connection
+
+from core.models import DailyPDCA, Post, SearchLog
+
+
+def fetch_pdca_and_logs(
+    conn: Connection, agent_id: int, target_date: date
+) -> tuple[dict[str, Any] | None, list[Row[Any]]]:
+    rows = conn.execute(
+        select(DailyPDCA.analytics_summary["search"].label("search"), SearchLog.source, SearchLog.results_json)
+        .outerjoin(SearchLog, and_(SearchLog.agent_id == DailyPDCA.agent_id, SearchLog.date == DailyPDCA.date))
+        .where(DailyPDCA.agent_id == agent_id, DailyPDCA.date == target_date)
+    ).all()
+    if not rows:
+        return None, []
+    return rows[0].search, [row for row in rows if row.source is not None]
+
+
+# Compiled once and cached; bind the agent id as {"aid": ...} when executing.
+scheduled_posts_for_agent = lambda_stmt(
+    lambda: select(Post.id).where(Post.agent_id == bindparam("aid"), Post.scheduled_at.is_not(None))
+)
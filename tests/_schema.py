@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import weakref
+
+from sqlalchemy import create_mock_engine
+from sqlalchemy.engine import Engine
+
+from core.db import Base
+
+
+def _capture_schema_ddl() -> str:
+    statements: list[str] = []
+
+    def _capture(sql, *multiparams, **params) -> None:
+        statements.append(str(sql.compile(dialect=mock_engine.dialect)).strip())
+
+    mock_engine = create_mock_engine("sqlite+pysqlite://", _capture)
+    Base.metadata.create_all(mock_engine, checkfirst=False)
+    return ";\n".join(statements) + ";"
+
+
+# Compiled once per process and replayed as a single script, skipping create_all's per-table checks.
+SCHEMA_DDL = _capture_schema_ddl()
+_READY_ENGINES: weakref.WeakSet[Engine] = weakref.WeakSet()
+
+
+def ensure_schema(engine: Engine) -> None:
+    if engine in _READY_ENGINES:
+        return
+    raw = engine.raw_connection()
+    try:
+        raw.driver_connection.executescript(SCHEMA_DDL)
+        raw.commit()
+    finally:
+        raw.close()
+    _READY_ENGINES.add(engine)
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+from collections.abc import Sequence
+from datetime import datetime
+from typing import Any, NamedTuple
+
+from sqlalchemy import String, bindparam, insert
+from sqlalchemy.orm import Session
+
+from core.models import Account, AccountType, Agent, AgentStatus, CostLog, Post, PostType
+
+
+class SeededAgent(NamedTuple):
+    id: int
+    account_id: int
+
+
+def seed_agent(
+    session: Session,
+    *,
+    agent_id: int | None = None,
+    status: AgentStatus = AgentStatus.active,
+    account_name: str = "acct",
+    account_type: AccountType = AccountType.business,
+    **agent_fields: Any,
+) -> SeededAgent:
+    account_id = session.execute(
+        insert(Account).returning(Account.id),
+        {"name": account_name, "type": account_type, "api_keys": {"x": "fake"}, "media_assets_path": "/tmp"},
+    ).scalar_one()
+    values = {"account_id": account_id, "status": status, "feature_toggles": {}, **agent_fields}
+    if agent_id is not None:
+        values["id"] = agent_id
+    seeded_id = session.execute(insert(Agent).returning(Agent.id), values).scalar_one()
+    return SeededAgent(id=seeded_id, account_id=account_id)
+
+
+def seed_agents(session: Session, specs: Sequence[tuple[int, AgentStatus]]) -> None:
+    account_ids = session.scalars(
+        insert(Account).returning(Account.id, sort_by_parameter_order=True),
+        [
+            {"name": f"account-{agent_id}", "type": AccountType.business, "api_keys": {"x": "fake"}, "media_assets_path": "/tmp"}
+            for agent_id, _ in specs
+        ],
+    ).all()
+    session.execute(
+        insert(Agent),
+        [
+            {"id": agent_id, "account_id": account_id, "status": status, "feature_toggles": {}}
+            for (agent_id, status), account_id in zip(specs, account_ids)
+        ],
+    )
+
+
+def seed_cost_logs(session: Session, rows: Sequence[dict[str, Any]]) -> None:
+    session.execute(insert(CostLog), list(rows))
+
+
+def bulk_seed_posts(
+    session: Session,
+    *,
+    agent_id: int,
+    contents: Sequence[str],
+    scheduled_at: datetime,
+    post_type: PostType = PostType.tweet,
+    target_post_url: str | None = None,
+    media_urls: str = "[]",
+) -> list[int]:
+    rows = [
+        {
+            "agent_id": agent_id,
+            "content": content,
+            "type": post_type,
+            "target_post_url": target_post_url,
+            "scheduled_at": scheduled_at,
+        }
+        for content in contents
+    ]
+    # media_urls is already-serialized JSON shared by every row; binding it as a String skips the JSON type's serializer.
+    media_urls_param = bindparam("media_urls_json", media_urls, type_=String)
+    stmt = insert(Post).values(media_urls=media_urls_param).returning(Post.id, sort_by_parameter_order=True)
+    return list(session.scalars(stmt, rows))
@@ -2,12 +2,106 @@ from __future__ import annotations
 
 import os
 import sys
+from collections.abc import Iterator
 from pathlib import Path
 
-os.environ.setdefault("DATABASE_URL", "sqlite+pysqlite:///:memory:")
+import pytest
+
+# One named shared-cache memory database per xdist worker, so parallel workers never share core.db state.
+_XDIST_WORKER = os.environ.get("PYTEST_XDIST_WORKER", "gw0")
+os.environ.setdefault(
+    "DATABASE_URL", f"sqlite+pysqlite:///file:memdb_{_XDIST_WORKER}?mode=memory&cache=shared&uri=true"
+)
 
 ROOT = Path(__file__).resolve().parents[1]
 CORE_SRC = ROOT / "packages" / "core"
 for p in (ROOT, CORE_SRC):
     if str(p) not in sys.path:
         sys.path.insert(0, str(p))
+
+from sqlalchemy import event
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from core.db import Base, get_engine
+
+from _db import make_memory_engine, use_test_pragmas
+from _schema import ensure_schema
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    # Registered here so the marker is accepted when pytest-xdist is not installed.
+    config.addinivalue_line("markers", "xdist_group(name): run tests sharing a name on the same xdist worker")
+
+
+@pytest.fixture(scope="session")
+def _engine() -> Iterator[Engine]:
+    engine = make_memory_engine()
+
+    # pysqlite defers BEGIN on its own, which breaks SAVEPOINT; let SQLAlchemy emit it.
+    @event.listens_for(engine, "connect")
+    def _disable_pysqlite_transactions(dbapi_connection, connection_record) -> None:
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _emit_begin(conn) -> None:
+        conn.exec_driver_sql("BEGIN")
+
+    ensure_schema(engine)
+    yield engine
+    engine.dispose()
+
+
+def _delete_all_rows(engine: Engine) -> None:
+    with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+
+
+@pytest.fixture(scope="session")
+def _core_schema() -> Engine:
+    engine = get_engine()
+    use_test_pragmas(engine)
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+# The DATABASE_URL engine behind core.db's globals, emptied before each test that uses it.
+@pytest.fixture
+def core_engine(_core_schema: Engine) -> Engine:
+    _delete_all_rows(_core_schema)
+    return _core_schema
+
+
+@pytest.fixture
+def fresh_engine() -> Iterator[Engine]:
+    engine = make_memory_engine(foreign_keys=True)
+    ensure_schema(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db_connection(_engine: Engine) -> Iterator[Connection]:
+    with _engine.connect() as conn:
+        transaction = conn.begin()
+        yield conn
+        transaction.rollback()
+
+
+@pytest.fixture
+def session_factory(db_connection: Connection) -> sessionmaker[Session]:
+    return sessionmaker(
+        bind=db_connection,
+        autoflush=False,
+        autocommit=False,
+        expire_on_commit=False,
+        future=True,
+        join_transaction_mode="create_savepoint",
+    )
+
+
+@pytest.fixture
+def db_session(session_factory: sessionmaker[Session]) -> Iterator[Session]:
+    with session_factory() as session:
+        yield session
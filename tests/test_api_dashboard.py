@@ -5,50 +5,41 @@ from datetime import date
 import pytest
 
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine, func, select
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import func, select
 
 from apps.api.app import main
-from core.db import Base
-from core.models import Account, AccountType, Agent, AgentStatus, AuditLog, CostLog
+from core.models import AccountType, Agent, AgentStatus, AuditLog
 
-
-def _make_test_session_factory(tmp_path):
-    db_path = tmp_path / "dashboard.db"
-    engine = create_engine(f"sqlite+pysqlite:///{db_path}", future=True)
-    TestingSessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
-    Base.metadata.create_all(bind=engine)
-    return TestingSessionLocal
+from _seed import seed_agent, seed_cost_logs
 
 
 def _seed_minimum_data(session_factory):
     with session_factory() as session:
-        account = Account(name="acct", type=AccountType.individual, api_keys={}, media_assets_path="/tmp")
-        session.add(account)
-        session.flush()
-        agent = Agent(account_id=account.id, status=AgentStatus.active, feature_toggles={"posting": True}, daily_budget=300)
-        session.add(agent)
-        session.flush()
-        session.add(
-            CostLog(
-                agent_id=agent.id,
-                date=date.today(),
-                x_api_cost=0,
-                x_api_cost_estimate=12,
-                llm_cost=3,
-                image_gen_cost=0,
-                total=15,
-                x_usage_units=120,
-            )
+        agent_id = seed_agent(
+            session, account_type=AccountType.individual, feature_toggles={"posting": True}, daily_budget=300
+        ).id
+        seed_cost_logs(
+            session,
+            [
+                {
+                    "agent_id": agent_id,
+                    "date": date.today(),
+                    "x_api_cost": 0,
+                    "x_api_cost_estimate": 12,
+                    "llm_cost": 3,
+                    "image_gen_cost": 0,
+                    "total": 15,
+                    "x_usage_units": 120,
+                }
+            ],
         )
         session.commit()
-        return agent.id
+        return agent_id
 
 
-def test_agents_list_returns_data(tmp_path) -> None:
-    test_session = _make_test_session_factory(tmp_path)
-    _seed_minimum_data(test_session)
-    main.SessionLocal = test_session
+def test_agents_list_returns_data(monkeypatch, session_factory) -> None:
+    _seed_minimum_data(session_factory)
+    monkeypatch.setattr(main, "SessionLocal", session_factory)
 
     client = TestClient(main.app)
     response = client.get("/api/agents")
@@ -59,16 +50,15 @@ def test_agents_list_returns_data(tmp_path) -> None:
     assert payload["agents"][0]["today_cost"]["total"] == 15.0
 
 
-def test_stop_resume_updates_agent_and_audit(tmp_path) -> None:
-    test_session = _make_test_session_factory(tmp_path)
-    agent_id = _seed_minimum_data(test_session)
-    main.SessionLocal = test_session
+def test_stop_resume_updates_agent_and_audit(monkeypatch, session_factory) -> None:
+    agent_id = _seed_minimum_data(session_factory)
+    monkeypatch.setattr(main, "SessionLocal", session_factory)
 
     client = TestClient(main.app)
     stop_res = client.post(f"/api/agents/{agent_id}/stop", json={"reason": "manual override"})
     assert stop_res.status_code == 200
 
-    with test_session() as session:
+    with session_factory() as session:
         agent = session.get(Agent, agent_id)
         assert agent is not None
         assert agent.status == AgentStatus.stopped
@@ -79,7 +69,7 @@ def test_stop_resume_updates_agent_and_audit(tmp_path) -> None:
     resume_res = client.post(f"/api/agents/{agent_id}/resume")
     assert resume_res.status_code == 200
 
-    with test_session() as session:
+    with session_factory() as session:
         agent = session.get(Agent, agent_id)
         assert agent is not None
         assert agent.status == AgentStatus.active
@@ -88,17 +78,16 @@ def test_stop_resume_updates_agent_and_audit(tmp_path) -> None:
         assert count_after_resume == 2
 
 
-def test_patch_agent_updates_budget_and_logs_audit(tmp_path) -> None:
-    test_session = _make_test_session_factory(tmp_path)
-    agent_id = _seed_minimum_data(test_session)
-    main.SessionLocal = test_session
+def test_patch_agent_updates_budget_and_logs_audit(monkeypatch, session_factory) -> None:
+    agent_id = _seed_minimum_data(session_factory)
+    monkeypatch.setattr(main, "SessionLocal", session_factory)
 
     client = TestClient(main.app)
     response = client.patch(f"/api/agents/{agent_id}", json={"daily_budget": 420})
 
     assert response.status_code == 200
     assert response.json()["daily_budget"] == 420
-    with test_session() as session:
+    with session_factory() as session:
         agent = session.get(Agent, agent_id)
         assert agent is not None
         assert agent.daily_budget == 420
@@ -106,10 +95,9 @@ def test_patch_agent_updates_budget_and_logs_audit(tmp_path) -> None:
         assert count == 1
 
 
-def test_patch_agent_merges_feature_toggles_and_keeps_existing_keys(tmp_path) -> None:
-    test_session = _make_test_session_factory(tmp_path)
-    agent_id = _seed_minimum_data(test_session)
-    main.SessionLocal = test_session
+def test_patch_agent_merges_feature_toggles_and_keeps_existing_keys(monkeypatch, session_factory) -> None:
+    agent_id = _seed_minimum_data(session_factory)
+    monkeypatch.setattr(main, "SessionLocal", session_factory)
 
     client = TestClient(main.app)
     response = client.patch(
@@ -123,18 +111,17 @@ def test_patch_agent_merges_feature_toggles_and_keeps_existing_keys(tmp_path) ->
     assert payload["feature_toggles"]["auto_post"] is True
     assert payload["feature_toggles"]["posting"] is True
 
-    with test_session() as session:
-        logs = session.scalars(select(AuditLog).where(AuditLog.agent_id == agent_id).order_by(AuditLog.id.asc())).all()
-        assert len(logs) == 1
-        assert logs[0].status == "success"
-        assert logs[0].event_type == "agent_update"
+    with session_factory() as session:
+        logs = session.execute(
+            select(AuditLog.status, AuditLog.event_type).where(AuditLog.agent_id == agent_id).order_by(AuditLog.id.asc())
+        ).all()
+        assert [tuple(log) for log in logs] == [("success", "agent_update")]
 
 
 @pytest.mark.parametrize("body", [{}, {"daily_budget": -1}])
-def test_patch_agent_rejects_invalid_payload(body, tmp_path) -> None:
-    test_session = _make_test_session_factory(tmp_path)
-    agent_id = _seed_minimum_data(test_session)
-    main.SessionLocal = test_session
+def test_patch_agent_rejects_invalid_payload(body, monkeypatch, session_factory) -> None:
+    agent_id = _seed_minimum_data(session_factory)
+    monkeypatch.setattr(main, "SessionLocal", session_factory)
 
     client = TestClient(main.app)
     response = client.patch(f"/api/agents/{agent_id}", json=body)
@@ -4,13 +4,12 @@ import re
 from datetime import date, datetime, timedelta, timezone
 from decimal import Decimal
 
-from sqlalchemy import create_engine, select
-from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy import select
+from sqlalchemy.orm import Session
 
 from apps.worker import daily_routine, posting_jobs
 from apps.worker.content_planner import build_post_drafts
 from core import BudgetLedger
-from core.db import Base
 from core.models import (
     Account,
     AccountType,
@@ -62,11 +61,8 @@ def _setup_agent(session: Session, agent_id: int = 1) -> Agent:
     return agent
 
 
-def test_content_planner_url_exposure_rule(monkeypatch) -> None:
-    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
-    Base.metadata.create_all(bind=engine)
-
-    with Session(engine) as session:
+def test_content_planner_url_exposure_rule(monkeypatch, session_factory) -> None:
+    with session_factory() as session:
         agent = _setup_agent(session, 77)
         session.add(
             SearchLog(
@@ -126,69 +122,59 @@ def test_content_planner_url_exposure_rule(monkeypatch) -> None:
             assert len(re.findall(r"https?://\S+", draft.text)) == 1
 
 
-def test_daily_routine_creates_mixed_post_types(monkeypatch, tmp_path) -> None:
+def test_daily_routine_creates_mixed_post_types(monkeypatch, tmp_path, session_factory) -> None:
     monkeypatch.chdir(tmp_path)
     monkeypatch.setenv("POSTS_PER_DAY", "4")
     monkeypatch.setenv("PLAN_THREAD_RATIO", "0.25")
     monkeypatch.setenv("PLAN_REPLY_RATIO", "0.25")
     monkeypatch.setenv("PLAN_QUOTE_RATIO", "0.25")
 
-    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
-    SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
-    Base.metadata.create_all(bind=engine)
-    monkeypatch.setattr(daily_routine, "engine", engine)
-    monkeypatch.setattr(daily_routine, "SessionLocal", SessionLocal)
-
-    result = daily_routine.run_daily_routine(agent_id=92, base_date=date(2026, 1, 10))
+    result = daily_routine.run_daily_routine(agent_id=92, base_date=date(2026, 1, 10), session_factory=session_factory)
     assert result["status"] == "success"
 
-    with Session(engine) as session:
-        planned = session.scalars(
-            select(Post).where(Post.agent_id == 92, Post.scheduled_at.is_not(None), Post.posted_at.is_(None))
+    with session_factory() as session:
+        planned_types = session.scalars(
+            select(Post.type).where(Post.agent_id == 92, Post.scheduled_at.is_not(None), Post.posted_at.is_(None))
         ).all()
-        pdca = session.scalar(select(DailyPDCA).where(DailyPDCA.agent_id == 92, DailyPDCA.date == date(2026, 1, 8)))
-
-    assert len(planned) == 4
-    assert {post.type for post in planned} >= {PostType.tweet, PostType.thread}
-    assert pdca is not None
+        pdca_id = session.scalar(select(DailyPDCA.id).where(DailyPDCA.agent_id == 92, DailyPDCA.date == date(2026, 1, 8)))
 
+    assert len(planned_types) == 4
+    assert set(planned_types) >= {PostType.tweet, PostType.thread}
+    assert pdca_id is not None
 
 
-def test_daily_routine_plans_without_search_logs(monkeypatch, tmp_path) -> None:
+def test_daily_routine_plans_without_search_logs(monkeypatch, tmp_path, session_factory) -> None:
     monkeypatch.chdir(tmp_path)
     monkeypatch.setenv("POSTS_PER_DAY", "4")
     monkeypatch.setenv("PLAN_THREAD_RATIO", "0.25")
     monkeypatch.setenv("PLAN_REPLY_RATIO", "0.5")
     monkeypatch.setenv("PLAN_QUOTE_RATIO", "0.25")
 
-    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
-    SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
-    Base.metadata.create_all(bind=engine)
-    monkeypatch.setattr(daily_routine, "engine", engine)
-    monkeypatch.setattr(daily_routine, "SessionLocal", SessionLocal)
-
-    result = daily_routine.run_daily_routine(agent_id=93, base_date=date(2026, 1, 10))
+    result = daily_routine.run_daily_routine(agent_id=93, base_date=date(2026, 1, 10), session_factory=session_factory)
     assert result["status"] == "success"
 
-    with Session(engine) as session:
-        planned = session.scalars(
-            select(Post).where(Post.agent_id == 93, Post.scheduled_at.is_not(None), Post.posted_at.is_(None))
+    with session_factory() as session:
+        planned = session.execute(
+            select(Post.type, Post.target_post_url).where(
+                Post.agent_id == 93, Post.scheduled_at.is_not(None), Post.posted_at.is_(None)
+            )
         ).all()
-        pdca = session.scalar(select(DailyPDCA).where(DailyPDCA.agent_id == 93, DailyPDCA.date == date(2026, 1, 8)))
+        used_search_material = session.scalar(
+            select(DailyPDCA.analytics_summary["used_search_material"].as_boolean()).where(
+                DailyPDCA.agent_id == 93, DailyPDCA.date == date(2026, 1, 8)
+            )
+        )
 
     assert len(planned) == 4
     assert all(post.type in (PostType.tweet, PostType.thread) for post in planned)
     assert all(post.target_post_url is None for post in planned)
-    assert pdca is not None
-    assert pdca.analytics_summary.get("used_search_material") is False
+    assert used_search_material is False
+
 
-def test_posting_jobs_supports_all_types_and_rate_limits(monkeypatch) -> None:
-    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
-    SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
-    Base.metadata.create_all(bind=engine)
-    monkeypatch.setattr(posting_jobs, "SessionLocal", SessionLocal)
+def test_posting_jobs_supports_all_types_and_rate_limits(monkeypatch, session_factory) -> None:
+    monkeypatch.setattr(posting_jobs, "SessionLocal", session_factory)
 
-    with Session(engine) as session:
+    with session_factory() as session:
         agent = _setup_agent(session, 55)
         target = TargetAccount(agent_id=agent.id, handle="x", like_limit=3, reply_limit=3, quote_rt_limit=3)
         session.add(target)
@@ -239,8 +225,8 @@ def test_posting_jobs_supports_all_types_and_rate_limits(monkeypatch) -> None:
     poster = MultiPoster()
     results = posting_jobs.run_posting_jobs(base_datetime=datetime(2026, 1, 11, 9, tzinfo=timezone.utc), poster=poster)
 
-    with Session(engine) as session:
-        posts = session.scalars(select(Post).where(Post.agent_id == 55).order_by(Post.id.asc())).all()
+    with session_factory() as session:
+        posts = session.execute(select(Post.type, Post.posted_at).where(Post.agent_id == 55).order_by(Post.id.asc())).all()
 
     statuses = {item["status"] for item in results}
     assert "posted" in statuses
@@ -250,38 +236,29 @@ def test_posting_jobs_supports_all_types_and_rate_limits(monkeypatch) -> None:
     assert all(p.posted_at is None for p in posts if p.type in (PostType.reply, PostType.quote_rt))
 
 
-def test_daily_routine_collects_target_post_candidates(monkeypatch, tmp_path) -> None:
+def test_daily_routine_collects_target_post_candidates(monkeypatch, tmp_path, session_factory) -> None:
     monkeypatch.chdir(tmp_path)
     monkeypatch.setenv("POSTS_PER_DAY", "2")
 
-    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
-    SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
-    Base.metadata.create_all(bind=engine)
-    monkeypatch.setattr(daily_routine, "engine", engine)
-    monkeypatch.setattr(daily_routine, "SessionLocal", SessionLocal)
-
-    with Session(engine) as session:
+    with session_factory() as session:
         agent = _setup_agent(session, 120)
         session.add(TargetAccount(agent_id=agent.id, handle="target_user", like_limit=3, reply_limit=3, quote_rt_limit=3))
         session.commit()
 
-    result = daily_routine.run_daily_routine(agent_id=120, base_date=date(2026, 1, 10))
+    result = daily_routine.run_daily_routine(agent_id=120, base_date=date(2026, 1, 10), session_factory=session_factory)
     assert result["status"] == "success"
 
-    with Session(engine) as session:
-        candidates = session.scalars(
-            select(TargetPostCandidate).where(TargetPostCandidate.agent_id == 120)
+    with session_factory() as session:
+        candidate_urls = session.scalars(
+            select(TargetPostCandidate.url).where(TargetPostCandidate.agent_id == 120)
         ).all()
 
-    assert candidates
-    assert all(candidate.url.startswith("https://x.com/target_user/status/") for candidate in candidates)
-
+    assert candidate_urls
+    assert all(url.startswith("https://x.com/target_user/status/") for url in candidate_urls)
 
-def test_content_planner_uses_target_candidates_for_reply_quote(monkeypatch) -> None:
-    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
-    Base.metadata.create_all(bind=engine)
 
-    with Session(engine) as session:
+def test_content_planner_uses_target_candidates_for_reply_quote(monkeypatch, session_factory) -> None:
+    with session_factory() as session:
         agent = _setup_agent(session, 121)
         target_date = date(2026, 1, 8)
         session.add_all(
@@ -326,11 +303,8 @@ def test_content_planner_uses_target_candidates_for_reply_quote(monkeypatch) ->
     assert all(d.target_post_url for d in plan.drafts)
 
 
-def test_content_planner_rebalances_when_target_candidates_exhausted(monkeypatch) -> None:
-    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
-    Base.metadata.create_all(bind=engine)
-
-    with Session(engine) as session:
+def test_content_planner_rebalances_when_target_candidates_exhausted(monkeypatch, session_factory) -> None:
+    with session_factory() as session:
         agent = _setup_agent(session, 122)
         target_date = date(2026, 1, 8)
         session.add(
@@ -3,11 +3,11 @@ from __future__ import annotations
 from datetime import datetime
 
 import pytest
-from sqlalchemy import create_engine, event
+from sqlalchemy import inspect
+from sqlalchemy.engine import Engine
 from sqlalchemy.exc import IntegrityError, StatementError
 from sqlalchemy.orm import Session
 
-from core.db import Base
 from core.models import (
     Account,
     AccountType,
@@ -21,17 +21,8 @@ from core.models import (
 
 
 @pytest.fixture()
-def session() -> Session:
-    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
-
-    @event.listens_for(engine, "connect")
-    def _set_sqlite_pragma(dbapi_connection, _connection_record):
-        cursor = dbapi_connection.cursor()
-        cursor.execute("PRAGMA foreign_keys=ON")
-        cursor.close()
-
-    Base.metadata.create_all(engine)
-    with Session(engine) as test_session:
+def session(fresh_engine: Engine) -> Session:
+    with Session(fresh_engine) as test_session:
         yield test_session
 
 
@@ -130,3 +121,17 @@ def test_post_type_rejects_old_value(session: Session) -> None:
 
     with pytest.raises(StatementError):
         session.flush()
+
+
+@pytest.mark.parametrize("table_name", ["daily_pdca", "cost_logs", "search_logs", "fetch_logs", "audit_logs"])
+def test_per_day_tables_index_agent_and_date(fresh_engine: Engine, table_name: str) -> None:
+    indexes = inspect(fresh_engine).get_indexes(table_name)
+
+    assert ["agent_id", "date"] in [index["column_names"] for index in indexes]
+
+
+@pytest.mark.parametrize("table_name", ["daily_pdca", "cost_logs", "search_logs", "fetch_logs"])
+def test_per_day_tables_drop_redundant_agent_index(fresh_engine: Engine, table_name: str) -> None:
+    indexes = inspect(fresh_engine).get_indexes(table_name)
+
+    assert ["agent_id"] not in [index["column_names"] for index in indexes]
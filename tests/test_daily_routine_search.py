@@ -2,100 +2,79 @@ from __future__ import annotations
 
 from datetime import date
 
-from sqlalchemy import create_engine, select
-from sqlalchemy.orm import Session, sessionmaker
+import pytest
+from sqlalchemy import select
 
 from apps.worker import daily_routine
-from core.db import Base
-from core.models import DailyPDCA, FetchLog, SearchLog
-
-
-def test_daily_routine_persists_search_logs(monkeypatch, tmp_path) -> None:
-    monkeypatch.chdir(tmp_path)
-    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
-    SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
-    Base.metadata.create_all(bind=engine)
-
-    monkeypatch.setattr(daily_routine, "engine", engine)
-    monkeypatch.setattr(daily_routine, "SessionLocal", SessionLocal)
-
-    result = daily_routine.run_daily_routine(agent_id=88, base_date=date(2026, 1, 10))
-
-    assert result["status"] == "success"
-
-    with Session(engine) as session:
-        logs = session.scalars(
-            select(SearchLog).where(SearchLog.agent_id == 88, SearchLog.date == date(2026, 1, 8))
-        ).all()
-
-    assert len(logs) == 2
-    assert {log.source for log in logs} == {"x", "web"}
-    assert all(log.results_json for log in logs)
-
-
-def test_daily_routine_marks_search_rate_limit_skip(monkeypatch, tmp_path) -> None:
-    monkeypatch.chdir(tmp_path)
-    monkeypatch.setenv("X_SEARCH_MAX", "0")
-    monkeypatch.setenv("WEB_SEARCH_MAX", "0")
-
-    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
-    SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
-    Base.metadata.create_all(bind=engine)
-
-    monkeypatch.setattr(daily_routine, "engine", engine)
-    monkeypatch.setattr(daily_routine, "SessionLocal", SessionLocal)
-
-    result = daily_routine.run_daily_routine(agent_id=89, base_date=date(2026, 1, 10))
-
-    assert result["status"] == "success"
-
-    with Session(engine) as session:
-        pdca = session.scalar(select(DailyPDCA).where(DailyPDCA.agent_id == 89, DailyPDCA.date == date(2026, 1, 8)))
-        logs = session.scalars(select(SearchLog).where(SearchLog.agent_id == 89, SearchLog.date == date(2026, 1, 8))).all()
-
-    assert pdca is not None
-    assert pdca.analytics_summary["search"]["count"] == 0
-    assert {item["reason"] for item in pdca.analytics_summary["search"]["skipped"]} == {"search_rate_limited"}
-    assert logs == []
-
-
-def test_daily_routine_skips_when_gemini_search_fails(monkeypatch, tmp_path) -> None:
-    class BrokenGeminiClient:
-        def search(self, query: str, k: int) -> list[dict[str, str]]:
-            del query, k
-            raise RuntimeError("boom")
-
+from apps.worker.web_fetch_client import WebFetchResult
+from core.models import FetchLog
+
+from _queries import fetch_pdca_and_logs
+
+pytestmark = pytest.mark.xdist_group(name=__name__)
+
+
+class BrokenGeminiClient:
+    def search(self, query: str, k: int) -> list[dict[str, str]]:
+        del query, k
+        raise RuntimeError("boom")
+
+
+@pytest.mark.parametrize(
+    ("agent_id", "env", "expected_sources", "expected_skip_reasons", "expected_web_status"),
+    [
+        pytest.param(88, {}, {"x", "web"}, set(), "ok", id="persists"),
+        pytest.param(
+            89,
+            {"X_SEARCH_MAX": "0", "WEB_SEARCH_MAX": "0"},
+            set(),
+            {"search_rate_limited"},
+            "ok",
+            id="rate-limited",
+        ),
+        pytest.param(
+            90,
+            {"USE_GEMINI_WEB_SEARCH": "1", "GEMINI_API_KEY": "dummy"},
+            {"x"},
+            {"gemini_search_failed"},
+            "failed",
+            id="gemini-failed",
+        ),
+    ],
+)
+def test_daily_routine_search_scenarios(
+    monkeypatch,
+    tmp_path,
+    db_connection,
+    session_factory,
+    agent_id: int,
+    env: dict[str, str],
+    expected_sources: set[str],
+    expected_skip_reasons: set[str],
+    expected_web_status: str,
+) -> None:
     monkeypatch.chdir(tmp_path)
-    monkeypatch.setenv("USE_GEMINI_WEB_SEARCH", "1")
-    monkeypatch.setenv("GEMINI_API_KEY", "dummy")
-
-    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
-    SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
-    Base.metadata.create_all(bind=engine)
+    for key, value in env.items():
+        monkeypatch.setenv(key, value)
 
-    monkeypatch.setattr(daily_routine, "engine", engine)
-    monkeypatch.setattr(daily_routine, "SessionLocal", SessionLocal)
     monkeypatch.setattr(daily_routine, "GeminiWebSearchClient", BrokenGeminiClient)
 
-    result = daily_routine.run_daily_routine(agent_id=90, base_date=date(2026, 1, 10))
+    result = daily_routine.run_daily_routine(
+        agent_id=agent_id, base_date=date(2026, 1, 10), session_factory=session_factory
+    )
 
     assert result["status"] == "success"
 
-    with Session(engine) as session:
-        pdca = session.scalar(select(DailyPDCA).where(DailyPDCA.agent_id == 90, DailyPDCA.date == date(2026, 1, 8)))
-        logs = session.scalars(
-            select(SearchLog).where(
-                SearchLog.agent_id == 90, SearchLog.date == date(2026, 1, 8), SearchLog.source == "web"
-            )
-        ).all()
+    search, logs = fetch_pdca_and_logs(db_connection, agent_id, date(2026, 1, 8))
 
-    assert pdca is not None
-    assert any(item["reason"] == "gemini_search_failed" for item in pdca.analytics_summary["search"]["skipped"])
-    assert pdca.analytics_summary["search"]["usage"]["web_search_status"] == "failed"
-    assert logs == []
+    assert search is not None
+    assert search["count"] == len(expected_sources)
+    assert {item["reason"] for item in search["skipped"]} == expected_skip_reasons
+    assert search["usage"]["web_search_status"] == expected_web_status
+    assert sorted((log.source, bool(log.results_json)) for log in logs) == [(source, True) for source in sorted(expected_sources)]
 
 
-def test_daily_routine_respects_web_fetch_limit(monkeypatch, tmp_path) -> None:
+def test_daily_routine_respects_web_fetch_limit(monkeypatch, tmp_path, db_connection, session_factory) -> None:
     class QueryHeavySearchClient:
         def search(self, query: str, k: int) -> list[dict[str, str]]:
             del k
@@ -108,9 +87,7 @@ def test_daily_routine_respects_web_fetch_limit(monkeypatch, tmp_path) -> None:
             ]
 
     class StubFetchClient:
-        def fetch(self, url: str):
-            from apps.worker.web_fetch_client import WebFetchResult
-
+        def fetch(self, url: str) -> WebFetchResult:
             return WebFetchResult(
                 url=url,
                 status="succeeded",
@@ -135,25 +112,16 @@ def test_daily_routine_respects_web_fetch_limit(monkeypatch, tmp_path) -> None:
     monkeypatch.setenv("WEB_FETCH_MAX", "0")
     monkeypatch.setenv("GEMINI_API_KEY", "dummy")
 
-    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
-    SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
-    Base.metadata.create_all(bind=engine)
-
-    monkeypatch.setattr(daily_routine, "engine", engine)
-    monkeypatch.setattr(daily_routine, "SessionLocal", SessionLocal)
     monkeypatch.setattr(daily_routine, "FakeWebSearchClient", QueryHeavySearchClient)
     monkeypatch.setattr(daily_routine, "WebFetchClient", StubFetchClient)
     monkeypatch.setattr(daily_routine, "GeminiSummarizer", StubSummarizer)
 
-    result = daily_routine.run_daily_routine(agent_id=91, base_date=date(2026, 1, 10))
+    result = daily_routine.run_daily_routine(agent_id=91, base_date=date(2026, 1, 10), session_factory=session_factory)
 
     assert result["status"] == "success"
 
-    with Session(engine) as session:
-        fetch_logs = session.scalars(
-            select(FetchLog).where(FetchLog.agent_id == 91, FetchLog.date == date(2026, 1, 8))
-        ).all()
+    fetch_logs = db_connection.execute(
+        select(FetchLog.status, FetchLog.failure_reason).where(FetchLog.agent_id == 91, FetchLog.date == date(2026, 1, 8))
+    ).all()
 
-    assert len(fetch_logs) == 1
-    assert fetch_logs[0].status == "skipped"
-    assert fetch_logs[0].failure_reason == "fetch_limit_reached"
+    assert [tuple(row) for row in fetch_logs] == [("skipped", "fetch_limit_reached")]
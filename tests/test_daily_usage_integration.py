@@ -1,48 +1,68 @@
 from __future__ import annotations
 
+from collections.abc import Callable, Iterator
 from datetime import date
 from decimal import Decimal
 
-import httpx
-from sqlalchemy import create_engine, select
-from sqlalchemy.orm import Session, sessionmaker
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
 
 from apps.worker import daily_routine
 from apps.worker.usage_reconcile import reconcile_app_usage
 from apps.worker.x_usage_client import XUsageClient
 from core import UsageReconciler
-from core.db import Base
 from core.models import CostLog, DailyPDCA
 
+pytestmark = pytest.mark.xdist_group(name=__name__)
 
-def test_x_usage_client_extracts_units_from_usage_api_payload() -> None:
-    payload = {"data": [{"usage": 7}, {"usage": "5"}]}
 
-    def handler(request: httpx.Request) -> httpx.Response:
-        assert request.url.path == "/2/usage/tweets"
-        return httpx.Response(200, json=payload)
+Route = Callable[[httpx.Request], httpx.Response]
 
-    client = XUsageClient(
-        bearer_token="token",
-        base_url="https://api.x.com/2",
-        http_client=httpx.Client(transport=httpx.MockTransport(handler)),
-    )
+
+@pytest.fixture(scope="module")
+def _mock_http_client() -> Iterator[tuple[httpx.Client, dict[str, Route]]]:
+    routes: dict[str, Route] = {}
+
+    def _router(request: httpx.Request) -> httpx.Response:
+        handler = routes.get(request.url.path)
+        if handler is None:
+            return httpx.Response(404, json={})
+        return handler(request)
+
+    with httpx.Client(transport=httpx.MockTransport(_router)) as client:
+        yield client, routes
+
+
+# The client is shared across the module; drop each test's routes so none leak into the next.
+@pytest.fixture
+def mock_http(_mock_http_client) -> Iterator[tuple[httpx.Client, dict[str, Route]]]:
+    _, routes = _mock_http_client
+    yield _mock_http_client
+    routes.clear()
+
+
+def test_x_usage_client_extracts_units_from_usage_api_payload(mock_http) -> None:
+    http_client, routes = mock_http
+    payload = {"data": [{"usage": 7}, {"usage": "5"}]}
+    routes["/2/usage/tweets"] = lambda request: httpx.Response(200, json=payload)
+
+    client = XUsageClient(bearer_token="token", base_url="https://api.x.com/2", http_client=http_client)
     snapshot = client.fetch_daily_usage(date(2026, 1, 8))
 
     assert snapshot.units == 12
     assert snapshot.raw == payload
 
 
-def test_usage_reconciler_upserts_app_wide_cost_log_row() -> None:
-    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
-    Base.metadata.create_all(bind=engine)
-
-    with Session(engine) as session:
-        reconciler = UsageReconciler(session, app_agent_id=0, unit_price=Decimal("0.5"))
-        row = reconciler.reconcile_x_usage(target_date=date(2026, 1, 8), units=10, raw={"data": {"usage": 10}})
-        session.commit()
+def test_usage_reconciler_upserts_app_wide_cost_log_row(db_session: Session) -> None:
+    reconciler = UsageReconciler(db_session, app_agent_id=0, unit_price=Decimal("0.5"))
+    row = reconciler.reconcile_x_usage(target_date=date(2026, 1, 8), units=10, raw={"data": {"usage": 10}})
+    db_session.commit()
 
-        saved = session.scalar(select(CostLog).where(CostLog.agent_id == 0, CostLog.date == date(2026, 1, 8)))
+    saved = db_session.scalar(select(CostLog).where(CostLog.agent_id == 0, CostLog.date == date(2026, 1, 8)))
 
     assert row.agent_id == 0
     assert saved is not None
@@ -50,53 +70,41 @@ def test_usage_reconciler_upserts_app_wide_cost_log_row() -> None:
     assert saved.x_api_cost_actual == Decimal("5.00")
 
 
-def test_daily_routine_records_usage_failure_in_pdca(monkeypatch, tmp_path) -> None:
-    db_url = f"sqlite+pysqlite:///{tmp_path / 'usage-fail.db'}"
-    engine = create_engine(db_url, future=True)
-    Base.metadata.create_all(bind=engine)
-
-    monkeypatch.setenv("DATABASE_URL", db_url)
+def test_daily_routine_records_usage_failure_in_pdca(monkeypatch, tmp_path, session_factory, db_session: Session) -> None:
+    monkeypatch.chdir(tmp_path)
     monkeypatch.setenv("USE_X_USAGE", "1")
-    monkeypatch.setattr(daily_routine, "engine", engine)
-    monkeypatch.setattr(daily_routine, "SessionLocal", sessionmaker(bind=engine, future=True))
 
     def boom(session: Session, *, usage_date: date) -> dict[str, object]:
         raise RuntimeError("usage_down")
 
     monkeypatch.setattr(daily_routine, "reconcile_app_usage", boom)
 
-    daily_routine.run_daily_routine(agent_id=501, base_date=date(2026, 1, 10))
+    daily_routine.run_daily_routine(agent_id=501, base_date=date(2026, 1, 10), session_factory=session_factory)
 
-    with Session(engine) as session:
-        pdca = session.scalar(select(DailyPDCA).where(DailyPDCA.agent_id == 501, DailyPDCA.date == date(2026, 1, 8)))
+    usage = db_session.execute(
+        select(
+            DailyPDCA.analytics_summary["usage_fetch_failed"].as_boolean().label("fetch_failed"),
+            DailyPDCA.analytics_summary["usage_error"].as_string().label("error"),
+        ).where(DailyPDCA.agent_id == 501, DailyPDCA.date == date(2026, 1, 8))
+    ).one()
 
-    assert pdca is not None
-    assert pdca.analytics_summary["usage_fetch_failed"] is True
-    assert pdca.analytics_summary["usage_error"] == "usage_down"
+    assert usage.fetch_failed is True
+    assert usage.error == "usage_down"
 
 
-def test_reconcile_app_usage_writes_app_row(monkeypatch) -> None:
+def test_reconcile_app_usage_writes_app_row(monkeypatch, mock_http, db_session: Session) -> None:
     monkeypatch.setenv("USE_X_USAGE", "1")
     monkeypatch.setenv("X_BEARER_TOKEN", "token")
+    http_client, routes = mock_http
+    routes["/2/usage/tweets"] = lambda request: httpx.Response(200, json={"data": {"usage": 9}})
 
-    def handler(request: httpx.Request) -> httpx.Response:
-        return httpx.Response(200, json={"data": {"usage": 9}})
-
-    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
-    Base.metadata.create_all(bind=engine)
-
-    with Session(engine) as session:
-        monkeypatch.setattr(
-            "apps.worker.usage_reconcile.XUsageClient",
-            lambda bearer_token: XUsageClient(
-                bearer_token=bearer_token,
-                base_url="https://api.x.com/2",
-                http_client=httpx.Client(transport=httpx.MockTransport(handler)),
-            ),
-        )
-        summary = reconcile_app_usage(session, usage_date=date(2026, 1, 8))
-        session.commit()
-        row = session.scalar(select(CostLog).where(CostLog.agent_id == 0, CostLog.date == date(2026, 1, 8)))
+    monkeypatch.setattr(
+        "apps.worker.usage_reconcile.XUsageClient",
+        lambda bearer_token: XUsageClient(bearer_token=bearer_token, base_url="https://api.x.com/2", http_client=http_client),
+    )
+    summary = reconcile_app_usage(db_session, usage_date=date(2026, 1, 8))
+    db_session.commit()
+    row = db_session.scalar(select(CostLog).where(CostLog.agent_id == 0, CostLog.date == date(2026, 1, 8)))
 
     assert summary["x_usage_reconciled"] is True
     assert summary["x_usage_units"] == 9
@@ -1,62 +1,56 @@
 from __future__ import annotations
 
-import os
-import subprocess
+import importlib
+import runpy
 import sys
+from pathlib import Path
+from types import ModuleType
 
+import pytest
+from alembic.config import main as alembic_main
+
+import core
+
+pytestmark = pytest.mark.xdist_group(name=__name__)
 
 ERROR_MESSAGE = "DATABASE_URL is required"
+ROOT = Path(__file__).resolve().parents[1]
 
 
-def _base_env() -> dict[str, str]:
-    env = os.environ.copy()
-    env.pop("DATABASE_URL", None)
-    env["PYTHONPATH"] = "packages/core"
-    return env
+@pytest.fixture(autouse=True)
+def _without_database_url(monkeypatch) -> None:
+    monkeypatch.delenv("DATABASE_URL", raising=False)
 
 
-def test_core_db_imports_without_database_url() -> None:
-    result = subprocess.run(
-        [sys.executable, "-c", "import core.db"],
-        capture_output=True,
-        text=True,
-        env=_base_env(),
-    )
+@pytest.fixture
+def fresh_core_db(monkeypatch) -> ModuleType:
+    # Re-import the whole core.db package in a sys.modules sandbox; monkeypatch puts the real one back afterwards.
+    for name in [name for name in sys.modules if name == "core.db" or name.startswith("core.db.")]:
+        monkeypatch.delitem(sys.modules, name)
+    monkeypatch.setattr(core, "db", core.db)
+    return importlib.import_module("core.db")
 
-    assert result.returncode == 0
 
+def test_core_db_imports_without_database_url(fresh_core_db) -> None:
+    assert callable(fresh_core_db.SessionLocal)
 
-def test_core_db_session_fails_without_database_url() -> None:
-    result = subprocess.run(
-        [sys.executable, "-c", "from core.db import SessionLocal; SessionLocal()"],
-        capture_output=True,
-        text=True,
-        env=_base_env(),
-    )
 
-    assert result.returncode != 0
-    assert ERROR_MESSAGE in result.stderr
+def test_core_db_session_fails_without_database_url(fresh_core_db) -> None:
+    with pytest.raises(RuntimeError, match=ERROR_MESSAGE):
+        fresh_core_db.SessionLocal()
 
 
-def test_worker_stops_without_database_url() -> None:
-    result = subprocess.run(
-        [sys.executable, "-m", "apps.worker.main", "--once"],
-        capture_output=True,
-        text=True,
-        env=_base_env(),
-    )
+def test_worker_stops_without_database_url(monkeypatch) -> None:
+    monkeypatch.setattr(sys, "argv", ["apps.worker.main", "--once"])
 
-    assert result.returncode != 0
-    assert ERROR_MESSAGE in result.stderr
+    with pytest.raises(RuntimeError, match=ERROR_MESSAGE):
+        runpy.run_module("apps.worker.main", run_name="__main__")
 
 
-def test_migration_stops_without_database_url() -> None:
-    result = subprocess.run(
-        [sys.executable, "-m", "alembic", "-c", "apps/api/alembic.ini", "upgrade", "head"],
-        capture_output=True,
-        text=True,
-        env=_base_env(),
-    )
+def test_migration_stops_without_database_url(monkeypatch) -> None:
+    monkeypatch.chdir(ROOT)
+    # env.py applies alembic.ini logging, which would disable pytest's loggers.
+    monkeypatch.setattr("logging.config.fileConfig", lambda *args, **kwargs: None)
 
-    assert result.returncode != 0
-    assert ERROR_MESSAGE in result.stderr
+    with pytest.raises(RuntimeError, match=ERROR_MESSAGE):
+        alembic_main(["-c", "apps/api/alembic.ini", "upgrade", "head"])
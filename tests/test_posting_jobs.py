@@ -1,14 +1,17 @@
 from __future__ import annotations
 
+from collections import namedtuple
 from datetime import datetime, timedelta, timezone
 
-from sqlalchemy import create_engine, select
+import pytest
 from sqlalchemy.dialects import postgresql
-from sqlalchemy.orm import Session, sessionmaker
 
 from apps.worker import posting_jobs
-from core.db import Base
-from core.models import Account, AccountType, Agent, AgentStatus, Post, PostType
+from core.models import Post, PostType
+
+from _seed import bulk_seed_posts, seed_agent
+
+_NOW = datetime(2026, 1, 10, 9, tzinfo=timezone.utc)
 
 
 class CountingPoster:
@@ -20,48 +23,52 @@ class CountingPoster:
         return f"ext-{agent_id}-{self.calls}"
 
 
-def _seed_due_post(session: Session) -> int:
-    account = Account(name="acct", type=AccountType.business, api_keys={"x": "fake"}, media_assets_path="/tmp")
-    session.add(account)
-    session.flush()
-    agent = Agent(id=55, account_id=account.id, status=AgentStatus.active, feature_toggles={})
-    session.add(agent)
-    session.flush()
-    post = Post(
-        agent_id=agent.id,
-        content="hello world",
-        type=PostType.tweet,
-        media_urls=[],
-        scheduled_at=datetime.now(timezone.utc) - timedelta(minutes=10),
-        posted_at=None,
-    )
-    session.add(post)
-    session.commit()
-    return post.id
-
-
-def test_run_posting_jobs_posts_due_items_once(monkeypatch) -> None:
-    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
-    SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
-    Base.metadata.create_all(bind=engine)
-
-    monkeypatch.setattr(posting_jobs, "SessionLocal", SessionLocal)
-
-    with Session(engine) as session:
-        post_id = _seed_due_post(session)
+Scenario = namedtuple("Scenario", "post_kwargs expected_result external_id poster_calls")
+
+
+@pytest.mark.parametrize(
+    "scenario",
+    [
+        pytest.param(
+            Scenario({"contents": ["hello world"]}, {"status": "posted", "external_id": "ext-55-1"}, "ext-55-1", 1),
+            id="posts_due_items_once",
+        ),
+        pytest.param(
+            Scenario(
+                {"contents": ["reply"], "post_type": PostType.reply, "target_post_url": "https://example.com/not-a-status-url"},
+                {"status": "skipped", "reason": "invalid_target_url"},
+                None,
+                0,
+            ),
+            id="reply_invalid_target_url_is_skipped",
+        ),
+    ],
+)
+def test_run_posting_jobs_scenarios(monkeypatch, session_factory, scenario: Scenario) -> None:
+    monkeypatch.setattr(posting_jobs, "SessionLocal", session_factory)
+
+    with session_factory() as session:
+        agent_id = seed_agent(session, agent_id=55).id
+        [post_id] = bulk_seed_posts(
+            session,
+            agent_id=agent_id,
+            scheduled_at=_NOW - timedelta(minutes=10),
+            **scenario.post_kwargs,
+        )
+        session.commit()
 
     poster = CountingPoster()
-    now = datetime.now(timezone.utc)
-    posting_jobs.run_posting_jobs(base_datetime=now, poster=poster)
-    posting_jobs.run_posting_jobs(base_datetime=now + timedelta(minutes=1), poster=poster)
+    result = posting_jobs.run_posting_jobs(base_datetime=_NOW, poster=poster)
+    posting_jobs.run_posting_jobs(base_datetime=_NOW + timedelta(minutes=1), poster=poster)
 
-    with Session(engine) as session:
-        post = session.scalar(select(Post).where(Post.id == post_id))
+    with session_factory() as session:
+        post = session.get(Post, post_id)
 
+    assert {"post_id": post_id, **scenario.expected_result} in result
     assert post is not None
-    assert post.posted_at is not None
-    assert post.external_id == "ext-55-1"
-    assert poster.calls == 1
+    assert post.external_id == scenario.external_id
+    assert (post.posted_at is not None) is (scenario.external_id is not None)
+    assert poster.calls == scenario.poster_calls
 
 
 def test_due_posts_claim_query_uses_skip_locked_for_postgres() -> None:
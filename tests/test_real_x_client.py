@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
 from datetime import date, datetime, timezone
 
 import pytest
@@ -9,67 +11,120 @@ httpx = pytest.importorskip("httpx")
 from core import ExternalPost
 from core.models import PostType
 
-from apps.worker.real_x_client import MissingXUserIdError, RealXClient
+from apps.worker.real_x_client import MissingXUserIdError, RealXClient, shared_http_client
+from apps.worker.x_usage_client import XUsageClient
 
+Handler = Callable[[httpx.Request], httpx.Response]
 
-def _build_client(handler):
-    transport = httpx.MockTransport(handler)
-    return httpx.Client(transport=transport, timeout=5.0)
 
+def _not_found(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(status_code=404, json={})
 
-def test_real_x_client_calls_expected_endpoints() -> None:
-    calls: list[httpx.Request] = []
-
-    def handler(request: httpx.Request) -> httpx.Response:
-        calls.append(request)
-        if request.url.path.endswith("/users/42/tweets"):
-            return httpx.Response(
-                status_code=200,
-                json={
-                    "data": [
-                        {
-                            "id": "123",
-                            "text": "hello",
-                            "created_at": "2026-01-08T01:00:00Z",
-                            "attachments": {"media_keys": ["m1"]},
-                        }
-                    ],
-                    "includes": {"media": [{"media_key": "m1", "url": "https://img.example/a.png"}]},
-                },
-            )
-        if request.url.path.endswith("/tweets"):
-            return httpx.Response(
-                status_code=200,
-                json={"data": [{"id": "123", "public_metrics": {"like_count": 4, "reply_count": 1, "retweet_count": 2}}]},
-            )
-        return httpx.Response(status_code=404, json={})
-
-    client = RealXClient(bearer_token="token", user_id="42", http_client=_build_client(handler))
-
-    posts = client.list_posts(agent_id=7, target_date=date(2026, 1, 8))
-    assert len(posts) == 1
-    assert posts[0].external_id == "123"
-    assert posts[0].media_urls == ["https://img.example/a.png"]
-
-    metrics = client.get_post_metrics(posts[0])
-    assert metrics.likes == 4
-
-    assert calls[0].url.path.endswith("/users/42/tweets")
-    assert calls[0].url.params["max_results"] == "100"
-    assert calls[0].url.params["start_time"] == "2026-01-08T00:00:00Z"
-    assert calls[0].url.params["end_time"] == "2026-01-09T00:00:00Z"
-    assert calls[1].url.path.endswith("/tweets")
-    assert calls[1].url.params["ids"] == "123"
 
+Call = tuple[str, str, dict[str, str]]
 
-def test_real_x_client_marks_impression_unavailable() -> None:
-    def handler(request: httpx.Request) -> httpx.Response:
+_CALLS: list[Call] = []
+_CURRENT_HANDLER: Handler = _not_found
+# One pooled client for the module; each test swaps in its handler via _use_handler().
+_MOCK_CLIENT = httpx.Client(transport=httpx.MockTransport(lambda request: _CURRENT_HANDLER(request)), timeout=5.0)
+
+
+def _use_handler(handler: Handler) -> httpx.Client:
+    global _CURRENT_HANDLER
+    _CURRENT_HANDLER = handler
+    return _MOCK_CLIENT
+
+
+@pytest.fixture(autouse=True)
+def _reset_handler() -> Iterator[None]:
+    yield
+    _use_handler(_not_found)
+
+
+@contextmanager
+def _recorded_calls() -> Iterator[list[Call]]:
+    _CALLS.clear()
+    try:
+        yield _CALLS
+    finally:
+        _CALLS.clear()
+
+
+def _record(request: httpx.Request) -> None:
+    # Keep plain (method, path, params) data rather than the live request object.
+    _CALLS.append((request.method, request.url.path, dict(request.url.params)))
+
+
+def _timeline_handler(request: httpx.Request) -> httpx.Response:
+    _record(request)
+    if request.url.path.endswith("/users/42/tweets"):
+        return httpx.Response(
+            status_code=200,
+            json={
+                "data": [
+                    {
+                        "id": "123",
+                        "text": "hello",
+                        "created_at": "2026-01-08T01:00:00Z",
+                        "attachments": {"media_keys": ["m1"]},
+                    }
+                ],
+                "includes": {"media": [{"media_key": "m1", "url": "https://img.example/a.png"}]},
+            },
+        )
+    if request.url.path.endswith("/tweets"):
         return httpx.Response(
             status_code=200,
-            json={"data": [{"id": "123", "public_metrics": {"like_count": 1, "reply_count": 0, "retweet_count": 0}}]},
+            json={"data": [{"id": "123", "public_metrics": {"like_count": 4, "reply_count": 1, "retweet_count": 2}}]},
         )
+    return httpx.Response(status_code=404, json={})
+
+
+def _no_impressions_handler(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(
+        status_code=200,
+        json={"data": [{"id": "123", "public_metrics": {"like_count": 1, "reply_count": 0, "retweet_count": 0}}]},
+    )
+
+
+def _forbidden_handler(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(status_code=403, json={"title": "Forbidden"})
 
-    client = RealXClient(bearer_token="token", user_id="42", http_client=_build_client(handler))
+
+def _batched_metrics_handler(request: httpx.Request) -> httpx.Response:
+    _record(request)
+    ids = request.url.params["ids"].split(",")
+    return httpx.Response(
+        status_code=200,
+        json={"data": [{"id": tweet_id, "public_metrics": {"like_count": int(tweet_id)}} for tweet_id in ids if tweet_id != "7"]},
+    )
+
+
+def test_real_x_client_calls_expected_endpoints() -> None:
+    client = RealXClient(bearer_token="token", user_id="42", http_client=_use_handler(_timeline_handler))
+
+    with _recorded_calls() as calls:
+        posts = client.list_posts(agent_id=7, target_date=date(2026, 1, 8))
+        assert len(posts) == 1
+        assert posts[0].external_id == "123"
+        assert posts[0].media_urls == ["https://img.example/a.png"]
+
+        metrics = client.get_post_metrics(posts[0])
+        assert metrics.likes == 4
+
+        (timeline_method, timeline_path, timeline_params), (lookup_method, lookup_path, lookup_params) = calls
+
+    assert (timeline_method, lookup_method) == ("GET", "GET")
+    assert timeline_path.endswith("/users/42/tweets")
+    assert timeline_params["max_results"] == "100"
+    assert timeline_params["start_time"] == "2026-01-08T00:00:00Z"
+    assert timeline_params["end_time"] == "2026-01-09T00:00:00Z"
+    assert lookup_path.endswith("/tweets")
+    assert lookup_params["ids"] == "123"
+
+
+def test_real_x_client_marks_impression_unavailable() -> None:
+    client = RealXClient(bearer_token="token", user_id="42", http_client=_use_handler(_no_impressions_handler))
     post = ExternalPost(
         external_id="123",
         posted_at=datetime(2026, 1, 8, tzinfo=timezone.utc),
@@ -84,13 +139,36 @@ def test_real_x_client_marks_impression_unavailable() -> None:
 
 
 def test_resolve_user_id_raises_on_403() -> None:
-    def handler(request: httpx.Request) -> httpx.Response:
-        return httpx.Response(status_code=403, json={"title": "Forbidden"})
-
-    client = RealXClient(bearer_token="token", user_id=None, http_client=_build_client(handler))
+    client = RealXClient(bearer_token="token", user_id=None, http_client=_use_handler(_forbidden_handler))
 
     try:
         client.resolve_user_id()
         assert False, "expected MissingXUserIdError"
     except MissingXUserIdError as exc:
         assert "set X_USER_ID" in str(exc)
+
+
+def test_clients_share_pooled_http_client_by_default() -> None:
+    first = RealXClient(bearer_token="token-a", user_id="1")
+    second = RealXClient(bearer_token="token-b", user_id="2")
+    usage = XUsageClient(bearer_token="token-c")
+
+    assert first._http_client is shared_http_client()
+    assert second._http_client is first._http_client
+    assert usage._http_client is first._http_client
+
+
+def test_list_post_metrics_batches_ids_per_lookup() -> None:
+    client = RealXClient(bearer_token="token", user_id="42", http_client=_use_handler(_batched_metrics_handler))
+    posts = [
+        ExternalPost(external_id=str(index), posted_at=datetime(2026, 1, 8, tzinfo=timezone.utc), text="x", type=PostType.tweet)
+        for index in range(150)
+    ]
+
+    with _recorded_calls() as calls:
+        metrics = client.list_post_metrics(posts)
+
+        assert [len(params["ids"].split(",")) for _, _, params in calls] == [100, 50]
+    assert [item.external_id for item in metrics] == [post.external_id for post in posts]
+    assert metrics[3].likes == 3
+    assert metrics[7].likes == 0
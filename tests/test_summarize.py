@@ -7,34 +7,40 @@ import httpx
 from apps.worker.summarize import GeminiSummarizer
 
 
+_RESPONSE_BODY_BYTES = json.dumps(
+    {
+        "candidates": [
+            {
+                "content": {
+                    "parts": [
+                        {
+                            "text": json.dumps(
+                                {
+                                    "summary": "これは要約です。" * 20,
+                                    "key_points": ["ポイント1", "ポイント2"],
+                                    "confidence": "med",
+                                    "safe_to_use": True,
+                                },
+                                ensure_ascii=False,
+                            )
+                        }
+                    ]
+                }
+            }
+        ]
+    },
+    ensure_ascii=False,
+).encode("utf-8")
+
+
+def _canned_handler(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(200, content=_RESPONSE_BODY_BYTES, headers={"content-type": "application/json"})
+
+
 def test_gemini_summarizer_parses_schema_response(monkeypatch) -> None:
     monkeypatch.setenv("GEMINI_API_KEY", "dummy")
 
-    def handler(request: httpx.Request) -> httpx.Response:
-        body = {
-            "candidates": [
-                {
-                    "content": {
-                        "parts": [
-                            {
-                                "text": json.dumps(
-                                    {
-                                        "summary": "これは要約です。" * 20,
-                                        "key_points": ["ポイント1", "ポイント2"],
-                                        "confidence": "med",
-                                        "safe_to_use": True,
-                                    },
-                                    ensure_ascii=False,
-                                )
-                            }
-                        ]
-                    }
-                }
-            ]
-        }
-        return httpx.Response(200, json=body)
-
-    summarizer = GeminiSummarizer(transport=httpx.MockTransport(handler))
+    summarizer = GeminiSummarizer(transport=httpx.MockTransport(_canned_handler))
     result = summarizer.summarize("long text")
 
     assert result["confidence"] == "med"
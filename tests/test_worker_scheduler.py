@@ -3,36 +3,19 @@ from __future__ import annotations
 from datetime import date
 
 from sqlalchemy import select
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Session
 
-from core.db import Base, engine
-from core.models import Account, AccountType, Agent, AgentStatus, DailyPDCA
+from core.models import AgentStatus, DailyPDCA
 
 from apps.worker import scheduler
 
+from _seed import seed_agents
 
-def _create_agent(session: Session, *, agent_id: int, status: AgentStatus) -> Agent:
-    account = Account(
-        name=f"account-{agent_id}",
-        type=AccountType.business,
-        api_keys={"x": "fake"},
-        media_assets_path="/tmp",
-    )
-    session.add(account)
-    session.flush()
-    agent = Agent(id=agent_id, account_id=account.id, status=status, feature_toggles={})
-    session.add(agent)
-    return agent
 
-
-def test_run_all_agents_runs_only_active_and_continues_on_error(monkeypatch) -> None:
-    Base.metadata.drop_all(bind=engine)
-    Base.metadata.create_all(bind=engine)
-
-    with Session(engine) as session:
-        _create_agent(session, agent_id=1, status=AgentStatus.active)
-        _create_agent(session, agent_id=2, status=AgentStatus.active)
-        _create_agent(session, agent_id=3, status=AgentStatus.paused)
+def test_run_all_agents_runs_only_active_and_continues_on_error(monkeypatch, core_engine: Engine) -> None:
+    with Session(core_engine) as session:
+        seed_agents(session, [(1, AgentStatus.active), (2, AgentStatus.active), (3, AgentStatus.paused)])
         session.commit()
 
     called: list[int] = []
@@ -61,7 +44,7 @@ def test_run_all_agents_runs_only_active_and_continues_on_error(monkeypatch) ->
     assert results[0]["rate_status"] is not None
     assert results[1]["status"] == "failed"
 
-    with Session(engine) as session:
+    with Session(core_engine) as session:
         pdca = session.scalar(select(DailyPDCA).where(DailyPDCA.agent_id == 2))
 
     assert pdca is not None
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timezone
+
+import pytest
+
+from core import BatchingXClient, ExternalPost, ExternalPostMetrics, XUsage
+from core.models import PostType
+
+
+class RecordingBatchClient:
+    def __init__(self, fail: bool = False, malformed: bool = False) -> None:
+        self.fail = fail
+        self.malformed = malformed
+        self.batches: list[list[str]] = []
+        self._lock = threading.Lock()
+
+    def resolve_user_id(self, handle_or_me: str = "me") -> str:
+        return "42"
+
+    def list_posts(self, agent_id: int, target_date: date) -> list[ExternalPost]:
+        return []
+
+    def get_post_metrics(self, external_post: ExternalPost) -> ExternalPostMetrics:
+        raise AssertionError("BatchingXClient must not call get_post_metrics upstream")
+
+    def list_post_metrics(self, external_posts: list[ExternalPost]) -> list[ExternalPostMetrics]:
+        with self._lock:
+            self.batches.append([post.external_id for post in external_posts])
+        if self.fail:
+            raise RuntimeError("upstream down")
+        if self.malformed:
+            return None  # type: ignore[return-value]
+        return [ExternalPostMetrics(external_id=post.external_id, likes=int(post.external_id)) for post in external_posts]
+
+    def get_daily_usage(self, usage_date: date) -> XUsage:
+        return XUsage(usage_date=usage_date, units=0)
+
+
+def _post(external_id: str) -> ExternalPost:
+    return ExternalPost(external_id=external_id, posted_at=datetime(2026, 1, 8, tzinfo=timezone.utc), text="x", type=PostType.tweet)
+
+
+def test_batching_client_coalesces_concurrent_metric_lookups() -> None:
+    upstream = RecordingBatchClient()
+    posts = [_post(str(index)) for index in range(120)]
+
+    with BatchingXClient(upstream, flush_interval=0.2, flush_size=50, max_batch=100) as client:
+        with ThreadPoolExecutor(max_workers=len(posts)) as pool:
+            metrics = list(pool.map(client.get_post_metrics, posts))
+
+    assert [item.likes for item in metrics] == list(range(120))
+    assert sum(len(batch) for batch in upstream.batches) == 120
+    assert len(upstream.batches) < 120
+    assert max(len(batch) for batch in upstream.batches) <= 100
+
+
+def test_batching_client_propagates_upstream_errors_and_rejects_after_close() -> None:
+    client = BatchingXClient(RecordingBatchClient(fail=True), flush_interval=0.01)
+
+    with pytest.raises(RuntimeError, match="upstream down"):
+        client.get_post_metrics(_post("1"))
+    assert client.resolve_user_id() == "42"
+
+    client.close()
+    with pytest.raises(RuntimeError, match="closed"):
+        client.get_post_metrics(_post("2"))
+
+
+def test_batching_client_fails_callers_on_malformed_upstream_response() -> None:
+    with BatchingXClient(RecordingBatchClient(malformed=True), flush_interval=0.01) as client:
+        with pytest.raises(TypeError):
+            client.get_post_metrics(_post("1"), timeout=5)
+        with pytest.raises(TypeError):
+            client.get_post_metrics(_post("2"), timeout=5)
+
+
+def test_batching_client_sends_duplicate_ids_upstream_once() -> None:
+    upstream = RecordingBatchClient()
+    posts = [_post("7")] * 5 + [_post("8")]
+
+    with BatchingXClient(upstream, flush_interval=0.2, flush_size=len(posts)) as client:
+        with ThreadPoolExecutor(max_workers=len(posts)) as pool:
+            metrics = list(pool.map(client.get_post_metrics, posts))
+
+    assert [item.likes for item in metrics] == [7, 7, 7, 7, 7, 8]
+    assert sorted(external_id for batch in upstream.batches for external_id in batch) == ["7", "8"]